@@ -1,8 +1,10 @@
 import os
 import shutil
 import sqlite3
+import io
 import datetime
 import hashlib  # if needed later for other purposes
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 import hou
@@ -15,89 +17,102 @@ from PIL import Image
 # Self-contained pHash code
 # -----------------------------
 
-# Use high-quality downsampling.
-ANTIALIAS = Image.LANCZOS
-
-def _binary_array_to_hex(arr):
+def _pack_bits(bits):
     """
-    Convert a binary (boolean) numpy array into a hex string.
+    Pack a flat array of 0/1 values into an integer, most significant bit first.
     """
-    bit_string = ''.join(str(int(b)) for b in arr.flatten())
-    width = int(np.ceil(len(bit_string) / 4))
-    return '{:0>{width}x}'.format(int(bit_string, 2), width=width)
+    bits = np.asarray(bits, dtype=np.uint8)
+    # packbits zero-pads the last byte on the right; shift the padding back out.
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return value >> (-len(bits) % 8)
 
 class ImageHash:
     """
-    Encapsulates an image hash (stored as a boolean numpy array).
+    Encapsulates an image hash (stored as its bits packed into an integer).
     Supports string conversion, equality, and Hamming distance comparisons.
     """
-    def __init__(self, binary_array):
-        self.hash = binary_array
+    def __init__(self, value, hash_bits=64):
+        self.hash = value
+        self.hash_bits = hash_bits
 
     def __str__(self):
-        return _binary_array_to_hex(self.hash)
+        width = int(np.ceil(self.hash_bits / 4))
+        return '{:0>{width}x}'.format(self.hash, width=width)
 
     def __repr__(self):
-        return repr(self.hash)
+        return f"ImageHash({self})"
+
+    def __int__(self):
+        return self.hash
 
     def __sub__(self, other):
         if other is None:
             raise TypeError("Other hash must not be None.")
-        if self.hash.size != other.hash.size:
+        if self.hash_bits != other.hash_bits:
             raise TypeError("ImageHashes must be of the same size.")
-        return np.count_nonzero(self.hash.flatten() != other.hash.flatten())
+        return bin(self.hash ^ other.hash).count("1")
 
     def __eq__(self, other):
         if other is None:
             return False
-        return np.array_equal(self.hash.flatten(), other.hash.flatten())
+        return self.hash_bits == other.hash_bits and self.hash == other.hash
 
-def dct_1d(vector):
+def _dct_matrix(N):
     """
-    Compute a 1D Discrete Cosine Transform (DCT-II) of a 1D numpy array.
+    Build the orthonormal DCT-II basis matrix of size (N x N).
+    Row k holds the k-th cosine basis vector, so D @ v is the 1D DCT of v.
     """
-    N = len(vector)
-    result = np.zeros(N, dtype=np.float64)
-    for k in range(N):
-        s = 0.0
-        for n in range(N):
-            s += vector[n] * np.cos(np.pi * (n + 0.5) * k / N)
-        if k == 0:
-            result[k] = s * np.sqrt(1.0 / N)
-        else:
-            result[k] = s * np.sqrt(2.0 / N)
-    return result
+    k = np.arange(N)[:, None]
+    n = np.arange(N)[None, :]
+    basis = np.sqrt(2.0 / N) * np.cos(np.pi * (n + 0.5) * k / N)
+    basis[0, :] *= np.sqrt(0.5)
+    return basis
+
+# phash always works on a fixed img_size block, so build its basis once.
+_DCT_N = 32
+_D = _dct_matrix(_DCT_N)
 
 def dct_2d(matrix):
     """
     Compute a 2D DCT-II on a 2D numpy array.
+    Rows and columns are transformed with two matrix products.
     """
     M, N = matrix.shape
-    # Apply 1D DCT to rows.
-    dct_rows = np.empty((M, N), dtype=np.float64)
-    for i in range(M):
-        dct_rows[i, :] = dct_1d(matrix[i, :])
-    # Apply 1D DCT to columns.
-    dct_cols = np.empty((M, N), dtype=np.float64)
-    for j in range(N):
-        dct_cols[:, j] = dct_1d(dct_rows[:, j])
-    return dct_cols
+    if M == N == _DCT_N:
+        return _D @ matrix @ _D.T
+    return _dct_matrix(M) @ matrix @ _dct_matrix(N).T
+
+# ITU-R 601 luma weights, the same ones PIL uses for its 'L' conversion.
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
 
 def phash(image, hash_size=8, img_size=32):
     """
-    Compute the perceptual hash (pHash) for a PIL Image.
+    Compute the perceptual hash (pHash) for a PIL Image or a float (H, W, C) numpy array.
     
     Steps:
-      1. Convert image to grayscale and resize to (img_size x img_size).
+      1. Convert image to grayscale and box-average it down to (img_size x img_size).
       2. Compute the 2D DCT of the image.
       3. Keep only the top-left (hash_size x hash_size) DCT coefficients.
       4. Compute the mean of these coefficients (excluding the DC term at [0,0]).
       5. Generate a binary hash: each bit is 1 if the coefficient is above the mean, else 0.
          The DC coefficient is forced to 0.
     """
-    # 1. Reduce size and convert to grayscale.
-    image = image.convert('L').resize((img_size, img_size), ANTIALIAS)
-    pixels = np.asarray(image, dtype=np.float64)
+    # 1. Convert to grayscale and reduce size.
+    if isinstance(image, np.ndarray):
+        gray = image[:, :, :3] @ _LUMA if image.shape[2] >= 3 else image[:, :, 0]
+    else:
+        gray = np.asarray(image.convert('L'), dtype=np.float32)
+    # Box-average into an img_size x img_size grid of nearly equal bins covering every pixel.
+    # A box mean is plenty for a hash that only thresholds low-frequency coefficients.
+    gray = gray.astype(np.float64)
+    height, width = gray.shape
+    edges_y = np.arange(img_size) * height // img_size
+    edges_x = np.arange(img_size) * width // img_size
+    sums = np.add.reduceat(np.add.reduceat(gray, edges_y, axis=0), edges_x, axis=1)
+    # Images smaller than the grid repeat pixels; reduceat returns them as-is.
+    counts_y = np.maximum(np.diff(np.append(edges_y, height)), 1)
+    counts_x = np.maximum(np.diff(np.append(edges_x, width)), 1)
+    pixels = sums / np.outer(counts_y, counts_x)
     
     # 2. Compute the 2D DCT.
     dct = dct_2d(pixels)
@@ -114,48 +129,58 @@ def phash(image, hash_size=8, img_size=32):
     diff = dct_low > avg
     diff[0, 0] = 0  # Force the DC coefficient to 0.
     
-    return ImageHash(diff)
+    return ImageHash(_pack_bits(diff.flatten()), diff.size)
+
+def hamming_distances(hashes, value):
+    """
+    Compute the Hamming distance between every hash in a uint64 array and a single hash.
+    """
+    diff = np.bitwise_xor(hashes, np.uint64(value))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff)
+    # NumPy < 2.0 has no popcount ufunc; count the unpacked bits instead.
+    return np.unpackbits(diff.view(np.uint8)).reshape(len(diff), 64).sum(axis=1)
+
+def _read_hdr(file_path):
+    """
+    Decode an HDR/EXR file with OpenImageIO into an in-memory oiio.ImageBuf.
+    The pixels stay in the file's native format; callers resize in OpenImageIO.
+    """
+    buf = oiio.ImageBuf(file_path)
+    if not buf.read(force=True) or buf.has_error:
+        raise ValueError(f"Could not open {file_path}: {buf.geterror()}")
+    return buf
 
-def compute_image_hash(file_path, hash_size=8, img_size=32):
+def compute_image_hash(file_path, hash_size=8, img_size=32, image=None):
     """
     Compute the perceptual hash (pHash) for an image.
-    For HDR/EXR files, OpenImageIO is used to read the image data and convert it to a PIL Image.
+    For HDR/EXR files, OpenImageIO resizes the image to (img_size x img_size) while reading;
+    pass an already decoded oiio.ImageBuf as `image` to skip the read.
     For other image types, PIL is used directly.
-    The resulting hash is computed using the pHash function.
+    The resulting hash is computed using the pHash function and returned as an integer.
     """
     try:
         ext = os.path.splitext(file_path)[1].lower()
-        if ext in [".exr", ".hdr"]:
-            # Use OpenImageIO to read HDR/EXR file.
-            input_image = oiio.ImageInput.open(file_path)
-            if not input_image:
-                raise ValueError(f"Could not open {file_path}")
-            spec = input_image.spec()
-            image_data = input_image.read_image("float")
-            input_image.close()
-            if image_data is None:
-                raise ValueError("Failed to read image data.")
-            image = np.array(image_data).reshape(spec.height, spec.width, spec.nchannels)
-            # Use first 3 channels for RGB; if only one channel exists, duplicate it.
-            if spec.nchannels >= 3:
-                image = image[:, :, :3]
-            else:
-                image = np.repeat(image[:, :, 0:1], 3, axis=2)
-            # Normalize to 0-255 and convert to uint8.
-            max_val = np.max(image)
-            if max_val > 0:
-                image = image / max_val * 255
-            else:
-                image = np.zeros_like(image)
-            image = image.astype(np.uint8)
-            pil_image = Image.fromarray(image, mode="RGB")
+        if image is not None or ext in [".exr", ".hdr"]:
+            # Let OpenImageIO filter straight down to the hash size. No normalization is
+            # needed: the hash thresholds coefficients against their mean, so it is scale invariant.
+            # A one-pixel box filter averages every source pixel into its cell, so small bright
+            # features such as the sun cannot alias in or out depending on the sample grid.
+            buf = image if image is not None else _read_hdr(file_path)
+            nchannels = min(3, buf.nchannels)
+            small = oiio.ImageBufAlgo.resize(buf, filtername="box", filterwidth=1.0,
+                                             roi=oiio.ROI(0, img_size, 0, img_size, 0, 1, 0, nchannels))
+            source = small.get_pixels(oiio.FLOAT)
         else:
-            # Open image using PIL directly.
-            pil_image = Image.open(file_path).convert("RGB")
+            # Open image using PIL directly. draft() lets the JPEG decoder scale down
+            # by up to 1/8 while decoding; other formats ignore it.
+            img = Image.open(file_path)
+            img.draft("RGB", (img_size * 2, img_size * 2))
+            source = img.convert("RGB")
         
         # Compute the perceptual hash using pHash.
-        hash_obj = phash(pil_image, hash_size=hash_size, img_size=img_size)
-        return str(hash_obj)
+        hash_obj = phash(source, hash_size=hash_size, img_size=img_size)
+        return int(hash_obj)
     except Exception as e:
         print(f"Error computing image hash: {e}")
         return None
@@ -180,10 +205,39 @@ else:
 
 print(HDRI_STORAGE_FOLDER)
 DB_PATH = os.path.join(HDRI_STORAGE_FOLDER, "hdri_database.db")
+# Images whose hashes differ by at most this many bits are treated as duplicates.
+DUPLICATE_HASH_DISTANCE = 5
+# Each import worker holds a full-resolution decode in the file's native pixel format
+# (about 800 MB for a 16K half-float EXR), so keep the pool small instead of one worker
+# per core to avoid exhausting Houdini's memory.
+MAX_IMPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+def hash_to_db(value):
+    # SQLite integers are signed 64-bit, so wrap the unsigned hash into that range.
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+# Constraints PRAGMA table_info cannot report, restored whenever the hdri table is rebuilt.
+HDRI_COLUMN_DEFS = {
+    "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+    "hash": "INTEGER UNIQUE",
+}
+
+def create_indexes(cursor):
+    # hash needs no index of its own: its UNIQUE constraint already keeps one.
+    cursor.execute("DROP INDEX IF EXISTS idx_hdri_hash")
+    # An earlier version indexed name with COLLATE NOCASE, which the ORDER BY name sort can't use.
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_hdri_name'")
+    row = cursor.fetchone()
+    if row and "NOCASE" in row[0].upper():
+        cursor.execute("DROP INDEX idx_hdri_name")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hdri_name ON hdri(name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_hdri_upload_date ON hdri(upload_date)")
 
 def initialize_database():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    # WAL is persistent for the database file and avoids an fsync per rollback-journal commit.
+    cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS hdri (
@@ -192,34 +246,88 @@ def initialize_database():
             preview_path TEXT NOT NULL,
             name TEXT NOT NULL,
             upload_date TEXT NOT NULL,
-            hash TEXT UNIQUE
+            hash INTEGER UNIQUE
         )
         """
     )
+    create_indexes(cursor)
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    if version < 2:
+        cursor.execute("PRAGMA table_info(hdri)")
+        columns_info = cursor.fetchall()
+        hash_type = next(col[2] for col in columns_info if col[1] == "hash")
+        if hash_type.upper() != "INTEGER":
+            # Older databases declared hash as TEXT, which turns bound integers back into
+            # strings. Rebuild the table with an INTEGER column and re-store every hash:
+            # version 0 wrote hex digests, version 1 decimal strings.
+            cursor.execute("SELECT id, hash FROM hdri WHERE hash IS NOT NULL")
+            rows = cursor.fetchall()
+            cursor.execute("BEGIN")
+            rebuild_table(cursor, "hdri", columns_info, HDRI_COLUMN_DEFS)
+            for hdri_id, value in rows:
+                number = int(value, 16) if version < 1 else int(value)
+                cursor.execute("UPDATE hdri SET hash = ? WHERE id = ?", (hash_to_db(number), hdri_id))
+        cursor.execute("PRAGMA user_version = 2")
+    if version < 3:
+        # Hashes stored before version 3 came from a different HDR preprocessing (max-normalized
+        # uint8, LANCZOS resize) and can sit well beyond DUPLICATE_HASH_DISTANCE from the current
+        # ones, so recompute them from the stored files. Rows whose file can't be hashed keep theirs.
+        cursor.execute("SELECT id, file_path, hash FROM hdri")
+        rows = cursor.fetchall()
+        if rows:
+            print(f"Recomputing image hashes for {len(rows)} HDRI(s)...")
+            with ThreadPoolExecutor(max_workers=MAX_IMPORT_WORKERS) as executor:
+                new_hashes = list(executor.map(compute_image_hash, [row[1] for row in rows]))
+            updates = [(hdri_id, old_hash, hash_to_db(new_hash))
+                       for (hdri_id, _, old_hash), new_hash in zip(rows, new_hashes) if new_hash is not None]
+            # Clear first so swapping values between rows can't trip the UNIQUE constraint.
+            for hdri_id, _, _ in updates:
+                cursor.execute("UPDATE hdri SET hash = NULL WHERE id = ?", (hdri_id,))
+            for hdri_id, old_hash, new_hash in updates:
+                try:
+                    cursor.execute("UPDATE hdri SET hash = ? WHERE id = ?", (new_hash, hdri_id))
+                except sqlite3.IntegrityError:
+                    # Another row already has this hash, i.e. an existing duplicate; leave it be.
+                    cursor.execute("UPDATE hdri SET hash = ? WHERE id = ?", (old_hash, hdri_id))
+        cursor.execute("PRAGMA user_version = 3")
     conn.commit()
     conn.close()
 
+# Tag columns only change through add_new_tag/drop_column_from_table, which reset this cache.
+_TAG_COLS_CACHE = None
+
 def get_tag_columns():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(hdri)")
-    cols = cursor.fetchall()
-    conn.close()
-    tag_cols = [col[1] for col in cols if col[1].startswith("tag_")]
-    return tag_cols
+    global _TAG_COLS_CACHE
+    if _TAG_COLS_CACHE is None:
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(hdri)")
+        cols = cursor.fetchall()
+        conn.close()
+        _TAG_COLS_CACHE = [col[1] for col in cols if col[1].startswith("tag_")]
+    return list(_TAG_COLS_CACHE)
+
+def invalidate_tag_columns():
+    global _TAG_COLS_CACHE
+    _TAG_COLS_CACHE = None
 
 def safe_tag_column(tag_name):
     return "tag_" + tag_name.strip().replace(" ", "_")
 
-def drop_column_from_table(db_path, table, column_to_drop):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(f"PRAGMA table_info({table})")
-    columns_info = cursor.fetchall()
-    new_columns = [col for col in columns_info if col[1] != column_to_drop]
+def rebuild_table(cursor, table, columns_info, column_defs=None):
+    """
+    Recreate `table` with the given PRAGMA table_info columns and copy its rows over.
+    column_defs maps a column name to a full type/constraint definition replacing the
+    one derived from table_info. The caller owns the transaction.
+    """
+    column_defs = column_defs or {}
     col_defs = []
-    for col in new_columns:
+    for col in columns_info:
         name = col[1]
+        if name in column_defs:
+            col_defs.append(f"{name} {column_defs[name]}")
+            continue
         typ = col[2]
         notnull = "NOT NULL" if col[3] else ""
         dflt = f"DEFAULT {col[4]}" if col[4] is not None else ""
@@ -229,26 +337,54 @@ def drop_column_from_table(db_path, table, column_to_drop):
         col_defs.append(" ".join(parts))
     col_defs_str = ", ".join(col_defs)
     temp_table = table + "_backup"
-    cursor.execute("BEGIN TRANSACTION;")
     cursor.execute(f"CREATE TABLE {temp_table} ({col_defs_str});")
-    col_names = [col[1] for col in new_columns]
+    col_names = [col[1] for col in columns_info]
     col_names_str = ", ".join(col_names)
+    # Keep the AUTOINCREMENT counter, otherwise ids (and HDRI folder names) of deleted rows get reused.
+    seq = None
+    cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_sequence'")
+    if cursor.fetchone():
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        seq = row[0] if row else None
     cursor.execute(f"INSERT INTO {temp_table} ({col_names_str}) SELECT {col_names_str} FROM {table};")
     cursor.execute(f"DROP TABLE {table};")
     cursor.execute(f"ALTER TABLE {temp_table} RENAME TO {table};")
+    if seq is not None:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq))
+    if table == "hdri":
+        # Dropping the old table dropped its indexes as well.
+        create_indexes(cursor)
+
+def drop_column_from_table(db_path, table, column_to_drop):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns_info = cursor.fetchall()
+    new_columns = [col for col in columns_info if col[1] != column_to_drop]
+    cursor.execute("BEGIN TRANSACTION;")
+    rebuild_table(cursor, table, new_columns, HDRI_COLUMN_DEFS if table == "hdri" else None)
     conn.commit()
     conn.close()
+    invalidate_tag_columns()
 
 class QWrapLayout(QtWidgets.QLayout):
     def __init__(self, parent=None, margin=0, spacing=-1):
         super().__init__(parent)
+        # Set up before setContentsMargins/setSpacing, which call the invalidate() override.
+        self.itemList = []
+        # Cached (width, height) size hints, parallel to itemList; None when stale.
+        self._hints = None
         if parent is not None:
             self.setContentsMargins(margin, margin, margin, margin)
         self.setSpacing(spacing)
-        self.itemList = []
 
     def addItem(self, item):
         self.itemList.append(item)
+        if self._hints is not None:
+            hint = item.sizeHint()
+            self._hints.append((hint.width(), hint.height()))
 
     def count(self):
         return len(self.itemList)
@@ -260,9 +396,17 @@ class QWrapLayout(QtWidgets.QLayout):
 
     def takeAt(self, index):
         if 0 <= index < len(self.itemList):
+            if self._hints is not None:
+                self._hints.pop(index)
             return self.itemList.pop(index)
         return None
 
+    def invalidate(self):
+        # Qt calls this whenever a child is shown or changes its hints, often once per
+        # child while the grid fills up, so only mark the cache stale; doLayout rebuilds it.
+        self._hints = None
+        super().invalidate()
+
     def hasHeightForWidth(self):
         return True
 
@@ -280,22 +424,28 @@ class QWrapLayout(QtWidgets.QLayout):
         return QtCore.QSize(200, 200)
 
     def doLayout(self, rect, testOnly):
+        if self._hints is None:
+            self._hints = []
+            for item in self.itemList:
+                hint = item.sizeHint()
+                self._hints.append((hint.width(), hint.height()))
         x = rect.x()
         y = rect.y()
         line_height = 0
-        for item in self.itemList:
-            space_x = self.spacing()
-            space_y = self.spacing()
-            next_x = x + item.sizeHint().width() + space_x
-            if next_x - space_x > rect.right() and line_height > 0:
+        space_x = self.spacing()
+        space_y = self.spacing()
+        right = rect.right()
+        for item, (width, height) in zip(self.itemList, self._hints):
+            next_x = x + width + space_x
+            if next_x - space_x > right and line_height > 0:
                 x = rect.x()
                 y += line_height + space_y
-                next_x = x + item.sizeHint().width() + space_x
+                next_x = x + width + space_x
                 line_height = 0
             if not testOnly:
-                item.setGeometry(QtCore.QRect(QtCore.QPoint(x, y), item.sizeHint()))
+                item.setGeometry(QtCore.QRect(x, y, width, height))
             x = next_x
-            line_height = max(line_height, item.sizeHint().height())
+            line_height = max(line_height, height)
         return y + line_height - rect.y()
 
 class HDRIInfoDialog(QtWidgets.QDialog):
@@ -304,6 +454,7 @@ class HDRIInfoDialog(QtWidgets.QDialog):
         self.setWindowTitle("Update HDRI Info")
         self.hdri_id = record[0]
         self.tag_checkboxes = {}
+        self.tag_rows = {}
         layout = QtWidgets.QFormLayout(self)
 
         self.name_edit = QtWidgets.QLineEdit(record[3])
@@ -331,17 +482,23 @@ class HDRIInfoDialog(QtWidgets.QDialog):
         layout.addRow(self.button_box)
 
     def load_tags(self):
-        for i in reversed(range(self.tags_layout.count())):
-            item = self.tags_layout.takeAt(i)
-            if item.widget():
-                item.widget().deleteLater()
-        self.tag_checkboxes = {}
+        # Only add/remove rows for tags that appeared or disappeared; existing rows keep
+        # whatever the user has ticked but not yet saved.
         tag_cols = get_tag_columns()
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        for col in tag_cols:
-            cursor.execute(f"SELECT {col} FROM hdri WHERE id = ?", (self.hdri_id,))
-            value = cursor.fetchone()[0]
+        for col in [c for c in self.tag_rows if c not in tag_cols]:
+            container = self.tag_rows.pop(col)
+            del self.tag_checkboxes[col]
+            self.tags_layout.removeWidget(container)
+            container.deleteLater()
+        new_cols = [c for c in tag_cols if c not in self.tag_rows]
+        values = []
+        if new_cols:
+            conn = sqlite3.connect(DB_PATH)
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(new_cols)} FROM hdri WHERE id = ?", (self.hdri_id,))
+            values = cursor.fetchone()
+            conn.close()
+        for col, value in zip(new_cols, values):
             hlayout = QtWidgets.QHBoxLayout()
             display_name = col[4:]
             checkbox = QtWidgets.QCheckBox(display_name)
@@ -355,7 +512,7 @@ class HDRIInfoDialog(QtWidgets.QDialog):
             container = QtWidgets.QWidget()
             container.setLayout(hlayout)
             self.tags_layout.addWidget(container)
-        conn.close()
+            self.tag_rows[col] = container
 
     def add_new_tag(self):
         new_tag = self.new_tag_edit.text().strip()
@@ -367,6 +524,7 @@ class HDRIInfoDialog(QtWidgets.QDialog):
         try:
             cursor.execute(f"ALTER TABLE hdri ADD COLUMN {col_name} BOOLEAN DEFAULT 0")
             conn.commit()
+            invalidate_tag_columns()
         except Exception as e:
             print(f"Error adding tag: {e}")
             conn.close()
@@ -409,10 +567,18 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         self.setWindowTitle("HDRI Preview Loader")
         self.setGeometry(100, 100, 800, 600)
         initialize_database()
+        # Keep decoded previews around (limit in KB) so refreshes don't reread the JPEGs.
+        QtGui.QPixmapCache.setCacheLimit(65536)
 
         self.layout = QtWidgets.QVBoxLayout()
         self.setLayout(self.layout)
 
+        # Coalesce bursts of search/filter changes into a single query.
+        self._search_timer = QtCore.QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(200)
+        self._search_timer.timeout.connect(self._do_search)
+
         self.search_layout = QtWidgets.QHBoxLayout()
         self.search_bar = QtWidgets.QLineEdit()
         self.search_bar.setPlaceholderText("Search HDRI...")
@@ -448,6 +614,7 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         self.scroll_area.setWidgetResizable(True)
         self.scroll_widget = QtWidgets.QWidget()
         self.wrap_layout = QWrapLayout(self.scroll_widget)
+        self._thumb_widgets = {}
         self.scroll_widget.setLayout(self.wrap_layout)
         self.scroll_area.setWidget(self.scroll_widget)
         self.layout.addWidget(self.scroll_area)
@@ -455,17 +622,24 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         self.load_hdri_images()
 
     def populate_filter_checkboxes(self):
-        for i in reversed(range(self.filter_layout.count())):
-            widget = self.filter_layout.takeAt(i).widget()
-            if widget:
-                widget.deleteLater()
-        self.filter_checkboxes = {}
-        for col in get_tag_columns():
-            display_name = col[4:]
-            cb = QtWidgets.QCheckBox(display_name)
-            cb.stateChanged.connect(self.search_hdri)
-            self.filter_layout.addWidget(cb)
-            self.filter_checkboxes[col] = cb
+        # Keep existing checkboxes (and their state); only sync the set of tags.
+        tag_cols = get_tag_columns()
+        removed_checked = False
+        for col in [c for c in self.filter_checkboxes if c not in tag_cols]:
+            cb = self.filter_checkboxes.pop(col)
+            removed_checked = removed_checked or cb.isChecked()
+            self.filter_layout.removeWidget(cb)
+            cb.deleteLater()
+        for col in tag_cols:
+            if col not in self.filter_checkboxes:
+                display_name = col[4:]
+                cb = QtWidgets.QCheckBox(display_name)
+                cb.stateChanged.connect(self.search_hdri)
+                self.filter_layout.addWidget(cb)
+                self.filter_checkboxes[col] = cb
+        if removed_checked:
+            # An active filter disappeared, so the visible results are stale.
+            self.search_hdri()
 
     def toggle_filters(self, checked):
         self.filter_widget.setVisible(checked)
@@ -497,15 +671,31 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         records = cursor.fetchall()
         conn.close()
 
-        for i in reversed(range(self.wrap_layout.count())):
-            widget = self.wrap_layout.takeAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
+        # Reuse the thumbnails of unchanged records and only build/delete the difference.
+        layout_items = {}
+        while self.wrap_layout.count():
+            item = self.wrap_layout.takeAt(0)
+            layout_items[item.widget()] = item
+        previous = self._thumb_widgets
+        self._thumb_widgets = {}
         for record in records:
-            self.wrap_layout.addWidget(self.create_thumbnail_widget(record))
+            old_record, widget = previous.pop(record[0], (None, None))
+            if widget is not None and old_record == record:
+                self.wrap_layout.addItem(layout_items[widget])
+            else:
+                if widget is not None:
+                    widget.deleteLater()
+                widget = self.create_thumbnail_widget(record)
+                self.wrap_layout.addWidget(widget)
+            self._thumb_widgets[record[0]] = (record, widget)
+        for _, widget in previous.values():
+            widget.deleteLater()
+        self.wrap_layout.invalidate()
 
     def search_hdri(self):
+        self._search_timer.start()
+
+    def _do_search(self):
         search_text = self.search_bar.text().strip()
         self.load_hdri_images(search_text)
 
@@ -514,7 +704,11 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         layout = QtWidgets.QVBoxLayout()
         btn = QtWidgets.QPushButton()
         btn.setFixedSize(150, 150)
-        pixmap = QtGui.QPixmap(record[2])
+        pixmap = QtGui.QPixmap()
+        if not QtGui.QPixmapCache.find(record[2], pixmap):
+            pixmap.load(record[2])
+            if not pixmap.isNull():
+                QtGui.QPixmapCache.insert(record[2], pixmap)
         if pixmap.isNull():
             pixmap = QtGui.QPixmap(150, 150)
             pixmap.fill(QtGui.QColor("gray"))
@@ -532,7 +726,7 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
         update_action = menu.addAction("Update")
         delete_action = menu.addAction("Delete")
         update_action.triggered.connect(lambda: self.update_hdri_info(record))
-        delete_action.triggered.connect(lambda: self.delete_hdri(record[0], record[1]))
+        delete_action.triggered.connect(lambda: self.delete_hdri(record[0], record[1], record[2]))
         options_button.setMenu(menu)
         name_layout.addWidget(options_button)
         layout.addLayout(name_layout)
@@ -545,83 +739,135 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
             self.load_hdri_images()
             self.populate_filter_checkboxes()
 
-    def generate_preview(self, input_path, output_path):
+    def generate_preview(self, input_path, output_path, image=None):
+        """
+        Write a 200x200 JPEG preview of input_path to output_path (a path or a binary file object).
+        For HDR/EXR sources an already decoded oiio.ImageBuf can be passed as `image`.
+        Returns True on success.
+        """
         brightness_factor = 2.0
         gamma = 0.8
         size = (200, 200)
         try:
             ext = os.path.splitext(input_path)[1].lower()
-            if ext in [".exr", ".hdr"]:
-                input_image = oiio.ImageInput.open(input_path)
-                if not input_image:
-                    raise ValueError(f"Could not open {input_path}")
-                spec = input_image.spec()
-                image_data = input_image.read_image("float")
-                input_image.close()
-                if image_data is None:
-                    raise ValueError("Failed to read image data.")
-                image = np.array(image_data).reshape(spec.height, spec.width, spec.nchannels)
-                if spec.nchannels > 3:
-                    image = image[:, :, :3]
-                image = image * brightness_factor
-                image = np.power(image, gamma)
-                image = np.clip(image * 255, 0, 255).astype(np.uint8)
-                img = Image.fromarray(image)
+            if image is not None or ext in [".exr", ".hdr"]:
+                src = image if image is not None else _read_hdr(input_path)
+                width, height = src.spec().width, src.spec().height
+                # Resize and tonemap in OpenImageIO; only the final 8-bit preview reaches Python.
+                scale = min(1.0, size[0] / width, size[1] / height)
+                out_w = max(1, int(round(width * scale)))
+                out_h = max(1, int(round(height * scale)))
+                nchannels = min(3, src.nchannels)
+                small = oiio.ImageBufAlgo.resize(src, roi=oiio.ROI(0, out_w, 0, out_h, 0, 1, 0, nchannels))
+                oiio.ImageBufAlgo.max(small, small, 0.0)
+                oiio.ImageBufAlgo.mul(small, small, brightness_factor)
+                oiio.ImageBufAlgo.pow(small, small, gamma)
+                oiio.ImageBufAlgo.clamp(small, small, 0.0, 1.0)
+                pixels = small.get_pixels(oiio.UINT8)
+                if pixels.shape[2] == 1:
+                    pixels = pixels[:, :, 0]
+                img = Image.fromarray(pixels).convert("RGB")
             else:
                 img = Image.open(input_path).convert("RGB")
-            img.thumbnail(size, Image.ANTIALIAS)
+                img.thumbnail(size, Image.LANCZOS)
             img.save(output_path, "JPEG")
-            print(f"Preview generated: {output_path}")
+            print(f"Preview generated for {input_path}")
+            return True
         except Exception as e:
             print(f"Error generating preview for {input_path}: {e}")
+            return False
+
+    def _ingest(self, file_path):
+        """
+        Hash a source image and render its preview JPEG in memory.
+        Touches neither Qt nor the database, so it can run on a worker thread.
+        """
+        image = None
+        if os.path.splitext(file_path)[1].lower() in [".exr", ".hdr"]:
+            # Decode once and share the buffer between the hash and the preview.
+            try:
+                image = _read_hdr(file_path)
+            except Exception as e:
+                print(f"Error reading {file_path}: {e}")
+                return None, None
+        image_hash = compute_image_hash(file_path, hash_size=8, img_size=32, image=image)
+        if image_hash is None:
+            return None, None
+        preview = io.BytesIO()
+        if not self.generate_preview(file_path, preview, image=image):
+            return image_hash, None
+        return image_hash, preview.getvalue()
+
+    @staticmethod
+    def _store_files(file_path, new_file_path, preview_path, preview_bytes):
+        os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+        shutil.copy(file_path, new_file_path)
+        if preview_bytes is not None:
+            with open(preview_path, "wb") as f:
+                f.write(preview_bytes)
 
     def add_hdri(self):
         file_dialog = QtWidgets.QFileDialog()
         file_paths, _ = file_dialog.getOpenFileNames(self, "Select HDRI(s)", "", "HDRI Files (*.hdr *.exr *.png *.jpg)")
         if file_paths:
-            for file_path in file_paths:
-                # Compute perceptual hash using the pHash implementation.
-                image_hash = compute_image_hash(file_path, hash_size=8, img_size=32)
-                if image_hash is None:
-                    print(f"Skipping {file_path} due to hash error.")
-                    continue
+            with ThreadPoolExecutor(max_workers=MAX_IMPORT_WORKERS) as executor:
+                # Decoding, hashing and preview rendering are independent per file.
+                results = list(executor.map(self._ingest, file_paths))
+                # One connection and one transaction for the whole batch.
                 conn = sqlite3.connect(DB_PATH)
                 cursor = conn.cursor()
-                cursor.execute("SELECT id FROM hdri WHERE hash = ?", (image_hash,))
-                result = cursor.fetchone()
-                if result:
-                    QtWidgets.QMessageBox.warning(self, "Duplicate HDRI", f"Image {os.path.basename(file_path)} already exists in the database.")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                try:
+                    cursor.execute("BEGIN")
+                    # Load every known hash once so each new image is checked with a single vectorized sweep.
+                    cursor.execute("SELECT hash FROM hdri WHERE hash IS NOT NULL")
+                    known_hashes = np.fromiter((int(row[0]) for row in cursor), dtype=np.int64).view(np.uint64)
+                    pending = []
+                    for file_path, (image_hash, preview_bytes) in zip(file_paths, results):
+                        if image_hash is None:
+                            print(f"Skipping {file_path} due to hash error.")
+                            continue
+                        distances = hamming_distances(known_hashes, image_hash)
+                        if distances.size and distances.min() <= DUPLICATE_HASH_DISTANCE:
+                            QtWidgets.QMessageBox.warning(self, "Duplicate HDRI", f"Image {os.path.basename(file_path)} matches an existing or already-selected HDRI.")
+                            continue
+                        known_hashes = np.append(known_hashes, np.uint64(image_hash))
+
+                        hdri_name = os.path.splitext(os.path.basename(file_path))[0]
+                        current_date = datetime.datetime.now().isoformat()
+                        cursor.execute(
+                            "INSERT INTO hdri (file_path, preview_path, name, upload_date, hash) VALUES (?, ?, ?, ?, ?)",
+                            ("", "", hdri_name, current_date, hash_to_db(image_hash)),
+                        )
+                        hdri_id = cursor.lastrowid
+
+                        folder_name = f"{hdri_id:05d}_{hdri_name}"
+                        hdri_folder = os.path.join(HDRI_STORAGE_FOLDER, folder_name)
+                        new_file_path = os.path.join(hdri_folder, os.path.basename(file_path))
+                        preview_path = os.path.join(hdri_folder, "preview.jpg")
+                        pending.append((hdri_id, file_path, new_file_path, preview_path, preview_bytes))
+
+                    # Copy sources and write previews in parallel, then record the paths.
+                    futures = [executor.submit(self._store_files, file_path, new_file_path, preview_path, preview_bytes)
+                               for _, file_path, new_file_path, preview_path, preview_bytes in pending]
+                    for future, (hdri_id, file_path, new_file_path, preview_path, _) in zip(futures, pending):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            # Drop this HDRI entirely so no folder is left without a row, or a row without files.
+                            shutil.rmtree(os.path.dirname(new_file_path), ignore_errors=True)
+                            cursor.execute("DELETE FROM hdri WHERE id = ?", (hdri_id,))
+                            QtWidgets.QMessageBox.warning(self, "Error", f"Error copying {os.path.basename(file_path)}: {e}")
+                            continue
+                        cursor.execute("UPDATE hdri SET file_path = ?, preview_path = ? WHERE id = ?",
+                                       (new_file_path, preview_path, hdri_id))
+                    conn.commit()
+                finally:
                     conn.close()
-                    continue
-
-                hdri_name = os.path.splitext(os.path.basename(file_path))[0]
-                current_date = datetime.datetime.now().isoformat()
-                cursor.execute(
-                    "INSERT INTO hdri (file_path, preview_path, name, upload_date, hash) VALUES (?, ?, ?, ?, ?)",
-                    ("", "", hdri_name, current_date, image_hash),
-                )
-                conn.commit()
-                cursor.execute("SELECT last_insert_rowid()")
-                hdri_id = cursor.fetchone()[0]
-                conn.close()
-
-                folder_name = f"{hdri_id:05d}_{hdri_name}"
-                hdri_folder = os.path.join(HDRI_STORAGE_FOLDER, folder_name)
-                os.makedirs(hdri_folder, exist_ok=True)
-                new_file_path = os.path.join(hdri_folder, os.path.basename(file_path))
-                shutil.copy(file_path, new_file_path)
-                preview_path = os.path.join(hdri_folder, "preview.jpg")
-                self.generate_preview(new_file_path, preview_path)
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE hdri SET file_path = ?, preview_path = ? WHERE id = ?",
-                               (new_file_path, preview_path, hdri_id))
-                conn.commit()
-                conn.close()
             self.load_hdri_images()
             self.populate_filter_checkboxes()
 
-    def delete_hdri(self, hdri_id, hdri_path):
+    def delete_hdri(self, hdri_id, hdri_path, preview_path=None):
         reply = QtWidgets.QMessageBox.question(
             self,
             "Delete HDRI",
@@ -633,6 +879,9 @@ class HDRIPreviewLoader(QtWidgets.QWidget):
                 folder_to_delete = os.path.dirname(hdri_path)
                 if os.path.exists(folder_to_delete):
                     shutil.rmtree(folder_to_delete)
+                if preview_path:
+                    # The path may be reused by a later import; don't serve the old pixmap.
+                    QtGui.QPixmapCache.remove(preview_path)
                 conn = sqlite3.connect(DB_PATH)
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM hdri WHERE id = ?", (hdri_id,))